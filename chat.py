@@ -37,6 +37,7 @@ from dotenv import load_dotenv
 import logging
 import logging.config
 from orchestration import Orchestrator
+from tools import close_retrieval_clients
 import asyncio
 
 LOGGING_CONFIG = {
@@ -126,6 +127,18 @@ def get_user_input():
         sys.exit(0)
 
 
+async def answer_and_close(orchestrator, question):
+    """
+    Answers the question and closes the retrieval clients before the event loop ends.
+
+    Each question runs in its own asyncio.run, so the pooled clients bound to that loop
+    are closed here instead of leaking one connection pool per question.
+    """
+    try:
+        return await orchestrator.answer(question)
+    finally:
+        await close_retrieval_clients()
+
 def send_question_to_python(question, conversation_id):
     """
     Process the question using the orchestrator.
@@ -147,7 +160,7 @@ def send_question_to_python(question, conversation_id):
     if question:
         try:
             orchestrator = Orchestrator(conversation_id, client_principal)
-            result = asyncio.run(orchestrator.answer(question))
+            result = asyncio.run(answer_and_close(orchestrator, question))
             if not isinstance(result, dict):
                 logger.error("Expected result to be a dictionary.")
                 return {"error": "Invalid response format from orchestrator."}
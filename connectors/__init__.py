@@ -2,4 +2,5 @@
 from .aoai import AzureOpenAIClient
 from .cosmosdb import CosmosDBClient
 from .sqldbs import SQLDBClient
-from .keyvault import get_secret
\ No newline at end of file
+from .keyvault import get_secret
+from .identity import get_credential, get_async_credential
\ No newline at end of file
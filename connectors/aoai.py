@@ -1,13 +1,19 @@
+import asyncio
 import logging
 import os
 import tiktoken
 import time
-from openai import AzureOpenAI, RateLimitError
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from collections import OrderedDict
+from openai import AzureOpenAI, AsyncAzureOpenAI, RateLimitError
+from azure.identity import get_bearer_token_provider
+from .identity import get_credential
 
 MAX_RETRIES = 10 # Maximum number of retries for rate limit errors
 MAX_EMBEDDINGS_MODEL_INPUT_TOKENS = 8192
 MAX_GPT_MODEL_INPUT_TOKENS = 128000 # this is gpt4o max input, if using gpt35turbo use 16385
+EMBEDDINGS_BATCH_MAX = 16 # Maximum number of texts sent in a single batched embeddings request
+EMBEDDINGS_BATCH_WAIT_MS = 5 # Time to wait for more texts before sending a batch
+EMBEDDINGS_CACHE_SIZE = 1024 # Maximum number of texts whose embeddings are kept in memory
 
 class AzureOpenAIClient:
     """
@@ -25,17 +31,94 @@ class AzureOpenAIClient:
         self.openai_api_base = f"https://{self.openai_service_name}.openai.azure.com"
         self.openai_api_version = os.getenv('AZURE_OPENAI_API_VERSION')
 
-        token_provider = get_bearer_token_provider(
-            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
+        self.token_provider = get_bearer_token_provider(
+            get_credential(), "https://cognitiveservices.azure.com/.default"
         )
 
         self.client = AzureOpenAI(
             api_version=self.openai_api_version,
             azure_endpoint=self.openai_api_base,
-            azure_ad_token_provider=token_provider,
+            azure_ad_token_provider=self.token_provider,
             max_retries=MAX_RETRIES
         )
 
+        # Created on first async use, see _get_async_client
+        self._async_client = None
+        self._async_client_loop = None
+
+        # Created on first batched call, see get_embeddings_batched
+        self._embeddings_queue = None
+        self._embeddings_worker = None
+
+        # Embeddings of recently seen texts, least recently used first
+        self._embeddings_cache = OrderedDict()
+
+    def _get_cached_embeddings(self, text):
+        """Returns a copy of the cached embeddings for the text, or None if they are not cached."""
+        embeddings = self._embeddings_cache.get(text)
+        if embeddings is None:
+            return None
+        self._embeddings_cache.move_to_end(text)
+        one_liner_text = text.replace('\n', ' ')
+        logging.info(f"[aoai]Using cached embeddings for text: {one_liner_text[:100]}")
+        return list(embeddings)
+
+    def _cache_embeddings(self, text, embeddings):
+        """Stores the embeddings for the text, evicting the least recently used entry when the cache is full."""
+        self._embeddings_cache[text] = list(embeddings)
+        self._embeddings_cache.move_to_end(text)
+        if len(self._embeddings_cache) > EMBEDDINGS_CACHE_SIZE:
+            self._embeddings_cache.popitem(last=False)
+
+    def _embeddings_rewrite_prompt(self, text):
+        """Returns the prompt to shorten a text that exceeds the embeddings model input, or None if it fits."""
+        num_tokens = GptTokenEstimator().estimate_tokens(text)
+        if num_tokens <= MAX_EMBEDDINGS_MODEL_INPUT_TOKENS:
+            return None
+        return f"Rewrite the text to be coherent and meaningful, reducing it to {MAX_EMBEDDINGS_MODEL_INPUT_TOKENS} tokens: {text}"
+
+    def _get_async_client(self):
+        """
+        Returns the AsyncAzureOpenAI client for the running event loop.
+
+        The async client's connection pool is bound to the event loop it was first used in,
+        so a new client is created whenever the running loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncAzureOpenAI(
+                api_version=self.openai_api_version,
+                azure_endpoint=self.openai_api_base,
+                azure_ad_token_provider=self.token_provider,
+                max_retries=MAX_RETRIES
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def aclose(self):
+        """
+        Closes the async client and stops the embeddings batch worker of the running event loop.
+
+        Call it before the loop ends (e.g. at the end of each asyncio.run), otherwise their
+        connections are only released when garbage collected. Both are recreated on next use.
+        """
+        loop = asyncio.get_running_loop()
+        if self._embeddings_worker is not None and self._embeddings_worker.get_loop() is loop:
+            worker, queue = self._embeddings_worker, self._embeddings_queue
+            self._embeddings_worker = None
+            self._embeddings_queue = None
+            worker.cancel()
+            # let the worker fail its current batch, then fail whatever is still queued
+            await asyncio.gather(worker, return_exceptions=True)
+            self._fail_pending_embeddings(queue, [])
+        if self._async_client is not None and self._async_client_loop is loop:
+            try:
+                await self._async_client.close()
+            except Exception as e:
+                logging.warning(f"[aoai]aclose: error closing the async client: {e}")
+            self._async_client = None
+            self._async_client_loop = None
+
     def get_completion(self, prompt, max_tokens=800, retry_after=True):
         one_liner_prompt = prompt.replace('\n', ' ')
         logging.info(f"[aoai] Getting completion for prompt: {one_liner_prompt[:100]}")
@@ -78,14 +161,18 @@ class AzureOpenAIClient:
             raise
 
     def get_embeddings(self, text, retry_after=True):
+        embeddings = self._get_cached_embeddings(text)
+        if embeddings is not None:
+            return embeddings
+        cache_key = text
+
         one_liner_text = text.replace('\n', ' ')
         logging.info(f"[aoai]Getting embeddings for text: {one_liner_text[:100]}")        
         openai_deployment = os.getenv('AZURE_OPENAI_EMBEDDING_DEPLOYMENT')
 
         # summarize in case it is larger than the maximum input tokens
-        num_tokens = GptTokenEstimator().estimate_tokens(text)
-        if (num_tokens > MAX_EMBEDDINGS_MODEL_INPUT_TOKENS):
-            prompt = f"Rewrite the text to be coherent and meaningful, reducing it to {MAX_EMBEDDINGS_MODEL_INPUT_TOKENS} tokens: {text}"
+        prompt = self._embeddings_rewrite_prompt(text)
+        if prompt is not None:
             text = self.get_completion(prompt)
             logging.info(f"[aoai]get_embeddings: rewriting text to fit in {MAX_EMBEDDINGS_MODEL_INPUT_TOKENS} tokens")
 
@@ -95,6 +182,7 @@ class AzureOpenAIClient:
                 model=openai_deployment
             )
             embeddings = response.data[0].embedding
+            self._cache_embeddings(cache_key, embeddings)
             return embeddings
         
         except RateLimitError as e:
@@ -112,6 +200,84 @@ class AzureOpenAIClient:
             logging.error(f"[aoai]get_embedding: An unexpected error occurred: {e}")
             raise
 
+    async def get_embeddings_batched(self, text):
+        """
+        Returns the embeddings for the text, coalescing concurrent calls into batched requests.
+
+        The text is queued and a background worker sends up to EMBEDDINGS_BATCH_MAX queued texts
+        in a single embeddings request, waiting at most EMBEDDINGS_BATCH_WAIT_MS for a batch to fill.
+        """
+        embeddings = self._get_cached_embeddings(text)
+        if embeddings is not None:
+            return embeddings
+        cache_key = text
+
+        # summarize in case it is larger than the maximum input tokens
+        prompt = self._embeddings_rewrite_prompt(text)
+        if prompt is not None:
+            text = await asyncio.to_thread(self.get_completion, prompt)
+            logging.info(f"[aoai]get_embeddings_batched: rewriting text to fit in {MAX_EMBEDDINGS_MODEL_INPUT_TOKENS} tokens")
+
+        loop = asyncio.get_running_loop()
+        if self._embeddings_worker is None or self._embeddings_worker.done() or self._embeddings_worker.get_loop() is not loop:
+            self._embeddings_queue = asyncio.Queue()
+            self._embeddings_worker = loop.create_task(self._embeddings_batch_worker(self._embeddings_queue))
+
+        future = loop.create_future()
+        self._embeddings_queue.put_nowait((text, future))
+        embeddings = await future
+        self._cache_embeddings(cache_key, embeddings)
+        return embeddings
+
+    async def _embeddings_batch_worker(self, queue):
+        """Drains the embeddings queue, sending the queued texts in batches and resolving their futures."""
+        loop = asyncio.get_running_loop()
+        openai_deployment = os.getenv('AZURE_OPENAI_EMBEDDING_DEPLOYMENT')
+        batch = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                deadline = loop.time() + EMBEDDINGS_BATCH_WAIT_MS / 1000
+                while len(batch) < EMBEDDINGS_BATCH_MAX:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                texts = [text for text, _ in batch]
+                logging.info(f"[aoai]Getting embeddings for a batch of {len(texts)} texts")
+                try:
+                    response = await self._get_async_client().embeddings.create(
+                        input=texts,
+                        model=openai_deployment
+                    )
+                    embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+                    for (_, future), embedding in zip(batch, embeddings):
+                        if not future.done():
+                            future.set_result(embedding)
+
+                except Exception as e:
+                    logging.error(f"[aoai]get_embeddings_batched: An unexpected error occurred: {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            # a stopped worker (e.g. cancelled) must not leave callers waiting on their futures
+            self._fail_pending_embeddings(queue, batch)
+
+    @staticmethod
+    def _fail_pending_embeddings(queue, batch):
+        """Fails the unresolved futures of the batch and of every text still in the queue."""
+        pending = list(batch)
+        while queue is not None and not queue.empty():
+            pending.append(queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("[aoai]get_embeddings_batched: the embeddings batch worker stopped"))
+
     def _truncate_input(self, text, max_tokens):
         input_tokens = GptTokenEstimator().estimate_tokens(text)
         if input_tokens > max_tokens:
@@ -0,0 +1,38 @@
+import functools
+import logging
+import os
+from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
+from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+from azure.identity.aio import ManagedIdentityCredential as AsyncManagedIdentityCredential
+
+##########################################################
+# IDENTITY
+##########################################################
+
+def _use_managed_identity():
+    # Azure Functions and App Service set IDENTITY_ENDPOINT when a managed identity is available
+    return bool(os.getenv("IDENTITY_ENDPOINT"))
+
+@functools.lru_cache(maxsize=None)
+def get_credential():
+    """
+    Returns the process-wide credential.
+
+    In Azure the managed identity is used directly (AZURE_CLIENT_ID selects a user-assigned
+    identity), skipping the DefaultAzureCredential probe chain at first token acquisition.
+    Elsewhere, e.g. local development, DefaultAzureCredential is used.
+    """
+    if _use_managed_identity():
+        logging.info("[identity] using managed identity credential")
+        return ManagedIdentityCredential(client_id=os.getenv("AZURE_CLIENT_ID"))
+    return DefaultAzureCredential()
+
+def get_async_credential():
+    """
+    Returns a new async credential, chosen the same way as get_credential.
+
+    A new instance is returned on each call since callers close it with `async with`.
+    """
+    if _use_managed_identity():
+        return AsyncManagedIdentityCredential(client_id=os.getenv("AZURE_CLIENT_ID"))
+    return AsyncDefaultAzureCredential()
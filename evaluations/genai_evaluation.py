@@ -54,6 +54,7 @@ import asyncio
 # Import Orchestrator for local execution
 try:
     from orchestration import Orchestrator
+    from tools import close_retrieval_clients
 except ImportError:
     print("Error: Could not import Orchestrator from 'orchestration' module.")
     sys.exit(1)
@@ -151,6 +152,18 @@ def send_question_to_rest_api(uri, x_functions_key, question, conversation_id):
         logger.exception(f"HTTP Request failed: {e}")
         return {"error": f"HTTP Request failed: {e}"}
 
+async def answer_and_close(orchestrator, question):
+    """
+    Answers the question and closes the retrieval clients before the event loop ends.
+
+    Each question runs in its own asyncio.run, so the pooled clients bound to that loop
+    are closed here instead of leaking one connection pool per question.
+    """
+    try:
+        return await orchestrator.answer(question)
+    finally:
+        await close_retrieval_clients()
+
 def send_question_to_python(question, conversation_id):
     """
     Process the question using the Orchestrator locally.
@@ -170,7 +183,7 @@ def send_question_to_python(question, conversation_id):
     if question:
         try:
             orchestrator = Orchestrator(conversation_id, client_principal)
-            result = asyncio.run(orchestrator.answer(question))
+            result = asyncio.run(answer_and_close(orchestrator, question))
             if not isinstance(result, dict):
                 logger.error("Expected result to be a dictionary.")
                 return {"error": "Invalid response format from orchestrator."}
@@ -1,9 +1,70 @@
+import functools
+import hashlib
 import logging
 import os
 import re 
+from collections import OrderedDict
 
+from autogen.function_utils import get_function_schema
 from connectors import AzureOpenAIClient
 
+SUMMARY_CACHE_SIZE = 128 # Maximum number of conversation summaries kept in memory
+TERMINATION_TRAILING_CHARS = " \t\r\n.!\"'`*" # Ignored after the TERMINATE keyword
+_conversation_summaries = OrderedDict()
+_function_schemas = {}
+
+@functools.lru_cache(maxsize=64)
+def _load_prompt(prompt_dir, agent_name, placeholders):
+    """Reads and processes a prompt file, see BaseAgentStrategy._read_prompt. Cached by its arguments."""
+    placeholders = dict(placeholders)
+
+    # Define the custom and default file paths
+    custom_file_path = os.path.join(prompt_dir, f"{agent_name}.custom.txt")
+    default_file_path = os.path.join(prompt_dir, f"{agent_name}.txt")
+                                 
+    # Check for the custom prompt file first
+    if os.path.exists(custom_file_path):
+        selected_file = custom_file_path
+        logging.info(f"[base_agent_strategy] Using custom file path: {custom_file_path}")            
+    elif os.path.exists(default_file_path):
+        selected_file = default_file_path
+        logging.info(f"[base_agent_strategy] Using default file path: {default_file_path}")                  
+    else:
+        logging.error(f"[base_agent_strategy] Prompt file for agent '{agent_name}' not found.")
+        raise FileNotFoundError(f"Prompt file for agent '{agent_name}' not found.")
+        
+    # Read and process the selected prompt file
+    with open(selected_file, "r") as f:
+        prompt = f.read().strip()
+            
+        # Replace placeholders provided in the 'placeholders' dictionary
+        if placeholders:
+            for key, value in placeholders.items():
+                prompt = prompt.replace(f"{{{{{key}}}}}", value)
+            
+        # Find any remaining placeholders in the prompt
+        pattern = r"\{\{([^}]+)\}\}"
+        matches = re.findall(pattern, prompt)
+            
+        # Process each unmatched placeholder
+        for placeholder_name in set(matches):
+            # Skip if placeholder was already replaced
+            if placeholders and placeholder_name in placeholders:
+                continue
+            # Look for a corresponding file in 'prompts/common'
+            common_file_path = os.path.join("prompts", "common", f"{placeholder_name}.txt")
+            if os.path.exists(common_file_path):
+                with open(common_file_path, "r") as pf:
+                    placeholder_content = pf.read().strip()
+                    prompt = prompt.replace(f"{{{{{placeholder_name}}}}}", placeholder_content)
+            else:
+                # Log a warning if the placeholder cannot be replaced
+                logging.warning(
+                    f"[base_agent_strategy] Placeholder '{{{{{placeholder_name}}}}}' could not be replaced."
+                )
+        return prompt
+
+
 class BaseAgentStrategy:
     def __init__(self):
         pass
@@ -42,6 +103,10 @@ class BaseAgentStrategy:
         `prompts/common` directory. If the file exists, the placeholder will be replaced 
         with the content of that file.
 
+        **Caching**:
+        - Processed prompts are cached in memory by strategy, agent name and 
+        placeholders, so prompt file changes are picked up after a restart.
+
         **Examples**:
         For an agent named `agent1` and a strategy type `customer_service`, the 
         following files are searched:
@@ -59,51 +124,8 @@ class BaseAgentStrategy:
         Raises:
         - FileNotFoundError: If neither a custom nor a default prompt file is found.
         """        
-        # Define the custom and default file paths
-        custom_file_path = os.path.join(self._prompt_dir(), f"{agent_name}.custom.txt")
-        default_file_path = os.path.join(self._prompt_dir(), f"{agent_name}.txt")
-                                 
-        # Check for the custom prompt file first
-        if os.path.exists(custom_file_path):
-            selected_file = custom_file_path
-            logging.info(f"[base_agent_strategy] Using custom file path: {custom_file_path}")            
-        elif os.path.exists(default_file_path):
-            selected_file = default_file_path
-            logging.info(f"[base_agent_strategy] Using default file path: {default_file_path}")                  
-        else:
-            logging.error(f"[base_agent_strategy] Prompt file for agent '{agent_name}' not found.")
-            raise FileNotFoundError(f"Prompt file for agent '{agent_name}' not found.")
-        
-        # Read and process the selected prompt file
-        with open(selected_file, "r") as f:
-            prompt = f.read().strip()
-            
-            # Replace placeholders provided in the 'placeholders' dictionary
-            if placeholders:
-                for key, value in placeholders.items():
-                    prompt = prompt.replace(f"{{{{{key}}}}}", value)
-            
-            # Find any remaining placeholders in the prompt
-            pattern = r"\{\{([^}]+)\}\}"
-            matches = re.findall(pattern, prompt)
-            
-            # Process each unmatched placeholder
-            for placeholder_name in set(matches):
-                # Skip if placeholder was already replaced
-                if placeholders and placeholder_name in placeholders:
-                    continue
-                # Look for a corresponding file in 'prompts/common'
-                common_file_path = os.path.join("prompts", "common", f"{placeholder_name}.txt")
-                if os.path.exists(common_file_path):
-                    with open(common_file_path, "r") as pf:
-                        placeholder_content = pf.read().strip()
-                        prompt = prompt.replace(f"{{{{{placeholder_name}}}}}", placeholder_content)
-                else:
-                    # Log a warning if the placeholder cannot be replaced
-                    logging.warning(
-                        f"[base_agent_strategy] Placeholder '{{{{{placeholder_name}}}}}' could not be replaced."
-                    )
-            return prompt
+        placeholders_key = tuple(sorted(placeholders.items())) if placeholders else ()
+        return _load_prompt(self._prompt_dir(), agent_name, placeholders_key)
 
     def _prompt_dir(self):
             """
@@ -120,9 +142,69 @@ class BaseAgentStrategy:
             prompts_dir = "prompts" + "/" + self.strategy_type
             return prompts_dir
     
+    @staticmethod
+    def _is_termination_msg(msg):
+        """
+        Returns True when the message asks to end the chat by saying TERMINATE.
+
+        The prompts ask agents to say TERMINATE at the end of their message, so only the end
+        is checked (ignoring whitespace, quotes and punctuation) instead of scanning it all.
+        """
+        content = msg.get("content")
+        return isinstance(content, str) and content.rstrip(TERMINATION_TRAILING_CHARS).endswith("TERMINATE")
+
+    def _llm_config_with_functions(self, llm_config, functions):
+        """
+        Returns a copy of llm_config that declares the given functions as tools.
+
+        Passing the tools when the caller agent is created replaces `register_function`, 
+        which rebuilds the caller's OpenAI client for every function registered. The JSON 
+        schema of each function is generated once per process and reused afterwards.
+
+        Parameters:
+        - llm_config (dict): The LLM configuration of the caller agent.
+        - functions (list): Dictionaries with the `function`, its `name` and `description`.
+
+        Returns:
+        - dict: The LLM configuration including the function tools.
+        """
+        tools = []
+        for function in functions:
+            key = (function["function"].__module__, function["function"].__qualname__, function["name"], function["description"])
+            if key not in _function_schemas:
+                _function_schemas[key] = get_function_schema(
+                    function["function"], name=function["name"], description=function["description"]
+                )
+            tools.append(_function_schemas[key])
+        return {**llm_config, "tools": llm_config.get("tools", []) + tools}
+
+    def _register_functions_for_execution(self, executor, functions):
+        """Registers the functions declared with `_llm_config_with_functions` for execution by the executor agent."""
+        for function in functions:
+            executor.register_for_execution(name=function["name"])(function["function"])
+
+    def _append_conversation_summary(self, prompt: str, conversation_summary: str) -> str:
+        """
+        Add the conversation summary at the end of a system prompt.
+
+        The summary changes every turn, keeping it after the static instructions leaves the 
+        prompt prefix unchanged so it can be served from the LLM provider's prompt cache.
+        Custom prompts that still have a `{{conversation_summary}}` placeholder get it replaced in place.
+        """
+        placeholder = "{{conversation_summary}}"
+        if placeholder in prompt:
+            return prompt.replace(placeholder, conversation_summary)
+        return f'{prompt}\n\n## Conversation History\n"{conversation_summary}"'
+
     def _summarize_conversation(self, history: list) -> str:
-        """Summarize the conversation history."""
+        """Summarize the conversation history, reusing the cached summary when the history is unchanged."""
         if history:
+            history_key = hashlib.blake2b(repr(history).encode()).digest()
+            if history_key in _conversation_summaries:
+                _conversation_summaries.move_to_end(history_key)
+                conversation_summary = _conversation_summaries[history_key]
+                logging.info(f"[base_agent_strategy] Conversation summary (cached): {conversation_summary[:200]}")
+                return conversation_summary
             aoai = AzureOpenAIClient()
             prompt = (
                 "Please summarize the following conversation, highlighting the main topics discussed, the specific subject "
@@ -131,6 +213,9 @@ class BaseAgentStrategy:
                 f"Conversation history: \n{history}"
             )
             conversation_summary = aoai.get_completion(prompt)
+            _conversation_summaries[history_key] = conversation_summary
+            if len(_conversation_summaries) > SUMMARY_CACHE_SIZE:
+                _conversation_summaries.popitem(last=False)
         else:
             conversation_summary = "The conversation just started."
         logging.info(f"[base_agent_strategy] Conversation summary: {conversation_summary[:200]}")
@@ -1,7 +1,7 @@
 import logging
 
-from autogen import UserProxyAgent, AssistantAgent, register_function
-from tools import vector_index_retrieve, get_today_date, get_time
+from autogen import UserProxyAgent, AssistantAgent
+from tools import vector_index_retrieve, vector_index_retrieve_many, get_today_date, get_time
 
 from .base_agent_strategy import BaseAgentStrategy
 from ..constants import CLASSIC_RAG
@@ -41,17 +41,41 @@ class ClassicRAGAgentStrategy(BaseAgentStrategy):
             system_message=user_proxy_prompt, 
             human_input_mode="NEVER",
             code_execution_config=False,
-            is_termination_msg=lambda msg: msg.get("content") is not None and "TERMINATE" in msg["content"]
+            is_termination_msg=self._is_termination_msg
         )
 
+        # Functions called by the assistant and executed by the user proxy
+        assistant_functions = [
+            {
+                "function": vector_index_retrieve,
+                "name": "vector_index_retrieve",
+                "description": "Search the knowledge base for sources to ground and give context to answer a user question."
+            },
+            {
+                "function": vector_index_retrieve_many,
+                "name": "vector_index_retrieve_many",
+                "description": "Search the knowledge base with several queries at once. Prefer it over multiple vector_index_retrieve calls when the question needs sources on more than one topic."
+            },
+            {
+                "function": get_today_date,
+                "name": "get_today_date",
+                "description": "Provides today's date in YYYY-MM-DD format."
+            },
+            {
+                "function": get_time,
+                "name": "get_time",
+                "description": "Provides the current time in HH:MM format."
+            }
+        ]
+
         # Summarize conversation history and create AssistantAgent
         conversation_summary = self._summarize_conversation(history)
-        assistant_prompt = self._read_prompt("classic_rag_assistant", {"conversation_summary": conversation_summary})
+        assistant_prompt = self._append_conversation_summary(self._read_prompt("classic_rag_assistant"), conversation_summary)
         assistant = AssistantAgent(
             name="assistant", 
             system_message=assistant_prompt, 
             human_input_mode="NEVER",
-            llm_config=llm_config
+            llm_config=self._llm_config_with_functions(llm_config, assistant_functions)
         )
 
         # Create chat closure agent
@@ -64,29 +88,7 @@ class ClassicRAGAgentStrategy(BaseAgentStrategy):
         )
 
         # Register functions
-        register_function(
-            vector_index_retrieve,
-            caller=assistant,
-            executor=user_proxy,
-            name="vector_index_retrieve", 
-            description="Search the knowledge base for sources to ground and give context to answer a user question."
-        )
-
-        register_function(
-            get_today_date,
-            caller=assistant,
-            executor=user_proxy,
-            name="get_today_date",
-            description="Provides today's date in YYYY-MM-DD format."
-        )
-
-        register_function(
-            get_time,
-            caller=assistant,
-            executor=user_proxy,
-            name="get_time",
-            description="Provides the current time in HH:MM format."
-        )
+        self._register_functions_for_execution(user_proxy, assistant_functions)
 
         # Define allowed transitions between agents
         allowed_transitions = {
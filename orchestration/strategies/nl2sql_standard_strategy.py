@@ -1,6 +1,6 @@
 import logging
 import os
-from autogen import UserProxyAgent, AssistantAgent, register_function
+from autogen import UserProxyAgent, AssistantAgent
 from .nl2sql_base_agent_strategy import NL2SQLBaseStrategy
 from ..constants import NL2SQL
 from typing import Optional, List, Dict, Union
@@ -40,17 +40,63 @@ class NL2SQLStandardStrategy(NL2SQLBaseStrategy):
             system_message=user_proxy_prompt,
             human_input_mode="NEVER",
             code_execution_config=False,
-            is_termination_msg=lambda msg: msg.get("content") is not None and "TERMINATE" in msg["content"]
+            is_termination_msg=self._is_termination_msg
         )
 
+        def get_schema_info(table_name: Optional[str] = None, column_name: Optional[str] = None) -> SchemaInfo:
+            return self._get_schema_info(table_name, column_name)
+
+        def get_all_tables_info() -> TablesList:
+            return self._get_all_tables_info()
+
+        def validate_sql_query(query: str) -> ValidateSQLResult:
+            return self._validate_sql_query(query)
+
+        async def execute_sql_query(query: str) -> ExecuteSQLResult:
+            return await self._execute_sql_query(query)
+
+        # Functions called by the assistant and executed by the user proxy
+        assistant_functions = [
+            {
+                "function": get_schema_info,
+                "name": "get_schema_info",
+                "description": "Retrieve a list of all table names and their descriptions from the data dictionary."
+            },
+            {
+                "function": get_all_tables_info,
+                "name": "get_all_tables_info",
+                "description": "Retrieve schema information from the data dictionary. Provide table_name or column_name to get information about the table or column."
+            },
+            {
+                "function": validate_sql_query,
+                "name": "validate_sql_query",
+                "description": "Validate the syntax of an SQL query. Returns is_valid as True if valid, or is_valid as False with an error message if invalid."
+            },
+            {
+                "function": execute_sql_query,
+                "name": "execute_sql_query",
+                "description": "Execute an SQL query and return the results as a list of dictionaries. Each dictionary represents a row."
+            },
+            {
+                "function": get_today_date,
+                "name": "get_today_date",
+                "description": "Provides today's date in the format YYYY-MM-DD."
+            },
+            {
+                "function": get_time,
+                "name": "get_time",
+                "description": "Provides the current time in the format HH:MM."
+            }
+        ]
+
         # Create Assistant Agent
         conversation_summary = self._summarize_conversation(history)
-        assistant_prompt = self._read_prompt("nl2sql_assistant", {"conversation_summary": conversation_summary})
+        assistant_prompt = self._append_conversation_summary(self._read_prompt("nl2sql_assistant"), conversation_summary)
         assistant = AssistantAgent(
             name="assistant",
             system_message=assistant_prompt,
             human_input_mode="NEVER",
-            llm_config=llm_config
+            llm_config=self._llm_config_with_functions(llm_config, assistant_functions)
         )
 
         # Create chat closure agent
@@ -62,60 +108,8 @@ class NL2SQLStandardStrategy(NL2SQLBaseStrategy):
             llm_config=llm_config
         )
 
-        def get_schema_info(table_name: Optional[str] = None, column_name: Optional[str] = None) -> SchemaInfo:
-            return self._get_schema_info(table_name, column_name)
-
-        def get_all_tables_info() -> TablesList:
-            return self._get_all_tables_info()
-
-        def validate_sql_query(query: str) -> ValidateSQLResult:
-            return self._validate_sql_query(query)     
-
-        # Register functions with assistant and user_proxy
-        register_function(
-            get_schema_info,
-            caller=assistant,
-            executor=user_proxy,
-            name="get_schema_info",
-            description="Retrieve a list of all table names and their descriptions from the data dictionary."
-        )
-
-        register_function(
-            get_all_tables_info,
-            caller=assistant,
-            executor=user_proxy,
-            name="get_all_tables_info",
-            description="Retrieve schema information from the data dictionary. Provide table_name or column_name to get information about the table or column."
-        )
-
-        register_function(
-            validate_sql_query,
-            caller=assistant,
-            executor=user_proxy,
-            name="validate_sql_query",
-            description="Validate the syntax of an SQL query. Returns is_valid as True if valid, or is_valid as False with an error message if invalid."
-        )
-
-        @user_proxy.register_for_execution()
-        @assistant.register_for_llm(description="Execute an SQL query and return the results as a list of dictionaries. Each dictionary represents a row.")
-        async def execute_sql_query(query: str) -> ExecuteSQLResult:
-            return await self._execute_sql_query(query)
-        
-        register_function(
-            get_today_date,
-            caller=assistant,
-            executor=user_proxy,
-            name="get_today_date",
-            description="Provides today's date in the format YYYY-MM-DD."
-        )
-
-        register_function(
-            get_time,
-            caller=assistant,
-            executor=user_proxy,
-            name="get_time",
-            description="Provides the current time in the format HH:MM."
-        )
+        # Register functions with user_proxy
+        self._register_functions_for_execution(user_proxy, assistant_functions)
 
         # Define allowed transitions between agents
         allowed_transitions = {
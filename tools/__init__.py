@@ -1,4 +1,5 @@
-from .retrieval.vector_index_retrieval import vector_index_retrieve
+from .retrieval.vector_index_retrieval import vector_index_retrieve, vector_index_retrieve_many
+from .retrieval.vector_index_retrieval import close_clients as close_retrieval_clients
 from .retrieval.queries_retrieval import queries_retrieval
 from .retrieval.tables_retrieval import tables_retrieval
 from .retrieval.columns_retrieval import columns_retrieval
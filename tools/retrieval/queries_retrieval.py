@@ -1,6 +1,5 @@
 from typing_extensions import Annotated
-from connectors import AzureOpenAIClient
-from azure.identity import DefaultAzureCredential
+from connectors import AzureOpenAIClient, get_credential
 import os
 import time
 import logging
@@ -29,7 +28,7 @@ def queries_retrieval(
     search_results = []
     search_query = input
     try:
-        credential = DefaultAzureCredential()
+        credential = get_credential()
         start_time = time.time()
         logging.info(f"[ai_search] Generating question embeddings. Search query: {search_query}")
         embeddings_query = aoai.get_embeddings(search_query)
@@ -52,7 +51,7 @@ def queries_retrieval(
                 "kind": "vector",
                 "vector": embeddings_query,
                 "fields": "contentVector",
-                "k": int(search_top_k)
+                "k": search_top_k
             }]
         elif search_approach == HYBRID_SEARCH_APPROACH:
             body["search"] = search_query
@@ -60,7 +59,7 @@ def queries_retrieval(
                 "kind": "vector",
                 "vector": embeddings_query,
                 "fields": "contentVector",
-                "k": int(search_top_k)
+                "k": search_top_k
             }]
 
         if use_semantic and search_approach != VECTOR_SEARCH_APPROACH:
@@ -77,14 +76,14 @@ def queries_retrieval(
         start_time = time.time()
         response = requests.post(search_endpoint, headers=headers, json=body)
         status_code = response.status_code
-        text = response.text
-        json_response = response.json()  # Renamed to avoid shadowing built-in json module
         if status_code >= 400:
+            text = response.text
             error_message = f'Status code: {status_code}.'
             if text:
                 error_message += f" Error: {text}."
             logging.error(f"[ai_search] Error {status_code} when searching documents. {error_message}")
         else:
+            json_response = response.json()  # Renamed to avoid shadowing built-in json module
             if json_response.get('value'):
                 logging.info(f"[ai_search] {len(json_response['value'])} documents retrieved")
                 for doc in json_response['value']:
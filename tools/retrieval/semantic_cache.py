@@ -0,0 +1,60 @@
+import logging
+import threading
+import time
+import numpy as np
+
+class SemanticCache:
+    """
+    In-process cache of retrieval results keyed on the query embedding.
+
+    A lookup returns the cached value of the most similar stored query when its cosine
+    similarity is at or above `threshold`. Entries expire after `ttl` seconds and, once
+    `max_entries` is reached, the oldest entry is overwritten.
+    """
+    def __init__(self, threshold=0.95, max_entries=256, ttl=3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._vectors = None # (max_entries, dimensions) matrix of normalized embeddings
+        self._values = [None] * max_entries
+        self._expires_at = np.zeros(max_entries)
+        self._size = 0
+        self._next = 0
+
+    def get(self, embedding):
+        """Returns the cached value for the most similar query, or None on a cache miss."""
+        query = self._normalize(embedding)
+        with self._lock:
+            if self._size == 0 or query is None:
+                return None
+            similarities = self._vectors[:self._size] @ query
+            similarities[self._expires_at[:self._size] < time.time()] = -1.0
+            index = int(np.argmax(similarities))
+            similarity = float(similarities[index])
+            if similarity < self.threshold:
+                return None
+            logging.info("[semantic_cache] cache hit. similarity: %.4f", similarity)
+            return self._values[index]
+
+    def set(self, embedding, value):
+        """Stores a value for the given query embedding."""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            self._vectors[self._next] = vector
+            self._values[self._next] = value
+            self._expires_at[self._next] = time.time() + self.ttl
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
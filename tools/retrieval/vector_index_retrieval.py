@@ -1,80 +1,259 @@
 from typing_extensions import Annotated
-from connectors import AzureOpenAIClient
-from azure.identity import DefaultAzureCredential
+from connectors import AzureOpenAIClient, get_credential
+import asyncio
+import io
 import os
 import time
 import logging
-import requests
+import aiohttp
+import numpy as np
+import orjson
+from typing import Callable, Dict, List
+from .semantic_cache import SemanticCache
 
-def vector_index_retrieve(
-    input: Annotated[str, "An optimized query string based on the user's ask and conversation history, when available"]
-) -> Annotated[str, "The output is a string with the search results"]:
-    aoai = AzureOpenAIClient()
+SEARCH_TOKEN_SCOPE = "https://search.azure.com/.default"
+VECTOR_SEARCH_APPROACH = 'vector'
+TERM_SEARCH_APPROACH = 'term'
+HYBRID_SEARCH_APPROACH = 'hybrid'
+TOKEN_REFRESH_MARGIN = 300 # Refresh the search token when it expires in less than 5 minutes
+
+# Reused across calls: building the credential and the OpenAI client is expensive.
+# Both are created on first use, so importing this module needs no Azure settings.
+_cred = None
+_aoai = None
+_search_token = None
+
+# Pooled keep-alive connections so consecutive searches skip the TCP and TLS handshakes
+SEARCH_POOL_SIZE = 20
+_session = None
+_session_loop = None
+
+# Transient search failures are retried here instead of failing the agent turn
+SEARCH_RETRY_TOTAL = 3
+SEARCH_RETRY_BACKOFF_FACTOR = 0.3 # Waits 0.3, 0.6 and 1.2 seconds between attempts
+SEARCH_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+SEARCH_RETRY_MAX_DELAY = 5 # Upper bound for a Retry-After wait, longer waits cost more than an LLM retry
+
+# Reuses the sources of semantically equivalent queries instead of querying the index again.
+# Opt-in (SEMANTIC_CACHE_ENABLED): close embeddings can still differ in a year or an entity.
+_SEMANTIC_CACHE = None
+
+def _term_body(search_query, embeddings_query):
+    return {
+        "select": "title, content, url, filepath, chunk_id",
+        "top": _TOP_K,
+        "search": search_query
+    }
+
+def _vector_body(search_query, embeddings_query):
+    return {
+        "select": "title, content, url, filepath, chunk_id",
+        "top": _TOP_K,
+        "vectorQueries": [{
+            "kind": "vector",
+            "vector": embeddings_query,
+            "fields": "contentVector",
+            "k": _TOP_K
+        }]
+    }
+
+def _hybrid_body(search_query, embeddings_query):
+    return {
+        "select": "title, content, url, filepath, chunk_id",
+        "top": _TOP_K,
+        "search": search_query,
+        "vectorQueries": [{
+            "kind": "vector",
+            "vector": embeddings_query,
+            "fields": "contentVector",
+            "k": _TOP_K
+        }]
+    }
 
-    search_top_k = os.getenv('AZURE_SEARCH_TOP_K', 3)
-    search_approach = os.getenv('AZURE_SEARCH_APPROACH', 'hybrid')
-    use_semantic = os.getenv('AZURE_SEARCH_USE_SEMANTIC', False)
-    semantic_search_config = os.getenv('AZURE_SEARCH_SEMANTIC_SEARCH_CONFIG', 'my-semantic-config')
+# Search request body for each search approach
+_BODY_BUILDERS: Dict[str, Callable[[str, np.ndarray], dict]] = {
+    TERM_SEARCH_APPROACH: _term_body,
+    VECTOR_SEARCH_APPROACH: _vector_body,
+    HYBRID_SEARCH_APPROACH: _hybrid_body
+}
+
+_CONFIG_LOADED = False
+
+def reload_config():
+    """
+    Reads the Azure AI Search settings from the environment.
+
+    The settings are read on the first search, call this function to pick up
+    environment changes made afterwards.
+    """
+    global _TOP_K, _APPROACH, _USE_SEMANTIC, _SEMANTIC_SEARCH_CONFIG, _SEARCH_ENDPOINT, _SEMANTIC_CACHE, _CONFIG_LOADED
+    _TOP_K = int(os.getenv('AZURE_SEARCH_TOP_K', 3))
+    _APPROACH = os.getenv('AZURE_SEARCH_APPROACH', HYBRID_SEARCH_APPROACH)
+    if _APPROACH not in _BODY_BUILDERS:
+        logging.warning("[ai_search] unknown search approach '%s', using '%s'", _APPROACH, HYBRID_SEARCH_APPROACH)
+        _APPROACH = HYBRID_SEARCH_APPROACH
+    _USE_SEMANTIC = os.getenv('AZURE_SEARCH_USE_SEMANTIC', False) == "true"
+    _SEMANTIC_SEARCH_CONFIG = os.getenv('AZURE_SEARCH_SEMANTIC_SEARCH_CONFIG', 'my-semantic-config')
     search_service = os.getenv('AZURE_SEARCH_SERVICE')
-    search_index = os.getenv('AZURE_SEARCH_INDEX', 'ragindex')	
+    search_index = os.getenv('AZURE_SEARCH_INDEX', 'ragindex')
     search_api_version = os.getenv('AZURE_SEARCH_API_VERSION', '2024-07-01')
+    _SEARCH_ENDPOINT = f"https://{search_service}.search.windows.net/indexes/{search_index}/docs/search?api-version={search_api_version}"
+    # a new cache on every reload, sources cached under the previous settings are not served
+    _SEMANTIC_CACHE = None
+    if os.getenv('SEMANTIC_CACHE_ENABLED', 'false') == "true":
+        _SEMANTIC_CACHE = SemanticCache(
+            threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.95)),
+            max_entries=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', 256)),
+            ttl=int(os.getenv('SEMANTIC_CACHE_TTL', 3600))
+        )
+    _CONFIG_LOADED = True
+
+def _ensure_config():
+    """Loads the search settings on first use, so a .env loaded after import is still picked up."""
+    if not _CONFIG_LOADED:
+        reload_config()
+
+def _get_credential():
+    """Returns the credential used for Azure AI Search tokens, creating it on first use."""
+    global _cred
+    if _cred is None:
+        _cred = get_credential()
+    return _cred
+
+def _get_aoai():
+    """Returns the shared AzureOpenAIClient, creating it on first use."""
+    global _aoai
+    if _aoai is None:
+        _aoai = AzureOpenAIClient()
+    return _aoai
+
+def _get_search_token():
+    """Returns a cached Azure AI Search access token, requesting a new one when it is about to expire."""
+    global _search_token
+    if _search_token is None or _search_token.expires_on - time.time() <= TOKEN_REFRESH_MARGIN:
+        _search_token = _get_credential().get_token(SEARCH_TOKEN_SCOPE)
+    return _search_token.token
+
+async def _aget_search_token():
+    """Async variant of _get_search_token, the blocking credential call only runs in a worker thread on refresh."""
+    if _search_token is not None and _search_token.expires_on - time.time() > TOKEN_REFRESH_MARGIN:
+        return _search_token.token
+    return await asyncio.to_thread(_get_search_token)
 
-    VECTOR_SEARCH_APPROACH = 'vector'
-    TERM_SEARCH_APPROACH = 'term'
-    HYBRID_SEARCH_APPROACH = 'hybrid'
+def _get_session():
+    """
+    Returns the pooled aiohttp session for the running event loop.
 
-    search_results = []
+    aiohttp sessions are bound to the loop they were created in, so a new one is
+    created whenever the running loop changes (e.g. one asyncio.run per question).
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=SEARCH_POOL_SIZE))
+        _session_loop = loop
+    return _session
+
+async def close_clients():
+    """
+    Closes the pooled search session and the OpenAI async client of the running event loop.
+
+    Meant for callers that run one event loop per question (chat.py, the evaluation script),
+    so they do not leak a connection pool per question. Do not call it from the function app:
+    its invocations share one long-lived loop, and the clients may be in use by another answer.
+    """
+    global _session, _session_loop
+    if _session is not None and _session_loop is asyncio.get_running_loop():
+        try:
+            await _session.close()
+        except Exception as e:
+            logging.warning("[ai_search] error closing the search session. %s", e)
+        _session = None
+        _session_loop = None
+    if _aoai is not None:
+        await _aoai.aclose()
+
+def _retry_delay(attempt, retry_after=None):
+    """Seconds to wait before the given retry, honoring a numeric Retry-After header up to SEARCH_RETRY_MAX_DELAY."""
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), SEARCH_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return min(SEARCH_RETRY_BACKOFF_FACTOR * (2 ** attempt), SEARCH_RETRY_MAX_DELAY)
+
+async def _post_search(headers, data):
+    """
+    Posts a search request and returns (status_code, text, json).
+
+    Connection errors and the status codes in SEARCH_RETRY_STATUS_CODES are retried up to
+    SEARCH_RETRY_TOTAL times with exponential backoff. Once retries are exhausted the last
+    error response is returned (or the connection error raised) to the caller.
+    """
+    for attempt in range(SEARCH_RETRY_TOTAL + 1):
+        try:
+            async with _get_session().post(_SEARCH_ENDPOINT, headers=headers, data=data) as response:
+                status_code = response.status
+                retry_after = response.headers.get('Retry-After')
+                # decode the body once: as text for the error message, as JSON otherwise
+                if status_code < 400:
+                    return status_code, None, orjson.loads(await response.read())
+                text = await response.text()
+        except aiohttp.ClientConnectionError as e:
+            if attempt >= SEARCH_RETRY_TOTAL:
+                raise
+            delay = _retry_delay(attempt)
+            logging.warning("[ai_search] connection error when searching documents, retrying in %.2f seconds. %s", delay, e)
+            await asyncio.sleep(delay)
+            continue
+
+        if status_code not in SEARCH_RETRY_STATUS_CODES or attempt >= SEARCH_RETRY_TOTAL:
+            return status_code, text, None
+        # the response is released before waiting, so its connection goes back to the pool
+        delay = _retry_delay(attempt, retry_after)
+        logging.warning("[ai_search] status %d when searching documents, retrying in %.2f seconds", status_code, delay)
+        await asyncio.sleep(delay)
+
+async def vector_index_retrieve(
+    input: Annotated[str, "An optimized query string based on the user's ask and conversation history, when available"]
+) -> Annotated[str, "The output is a string with the search results"]:
+    sources = ""
     search_query = input
     try:
-        credential = DefaultAzureCredential()
+        _ensure_config()
         start_time = time.time()
-        logging.info(f"[ai_search] generating question embeddings. search query: {search_query}")
-        embeddings_query = aoai.get_embeddings(search_query)
-        response_time = round(time.time() - start_time, 2)
-        logging.info(f"[ai_search] finished generating question embeddings. {response_time} seconds")
-        azureSearchKey = credential.get_token("https://search.azure.com/.default")
-        azureSearchKey = azureSearchKey.token
-
-        logging.info(f"[ai_search] querying azure ai search. search query: {search_query}")
+        logging.info("[ai_search] generating question embeddings. search query: %s", search_query)
+        # the embeddings and the search token are independent, fetch them concurrently
+        embeddings, azureSearchKey = await asyncio.gather(
+            _get_aoai().get_embeddings_batched(search_query),
+            _aget_search_token()
+        )
+        # float32 is the embedding model precision, orjson serializes it without the float64 digits
+        embeddings_query = np.asarray(embeddings, dtype=np.float32)
+        logging.info("[ai_search] finished generating question embeddings. %.2f seconds", time.time() - start_time)
+
+        semantic_cache = _SEMANTIC_CACHE
+        if semantic_cache is not None:
+            cached_sources = semantic_cache.get(embeddings_query)
+            if cached_sources is not None:
+                logging.info("[ai_search] returning cached sources. search query: %s", search_query)
+                return cached_sources
+
+        logging.info("[ai_search] querying azure ai search. search query: %s", search_query)
         # prepare body
-        body = {
-            "select": "title, content, url, filepath, chunk_id",
-            "top": search_top_k
-        }
-        if search_approach == TERM_SEARCH_APPROACH:
-            body["search"] = search_query
-        elif search_approach == VECTOR_SEARCH_APPROACH:
-            body["vectorQueries"] = [{
-                "kind": "vector",
-                "vector": embeddings_query,
-                "fields": "contentVector",
-                "k": int(search_top_k)
-            }]
-        elif search_approach == HYBRID_SEARCH_APPROACH:
-            body["search"] = search_query
-            body["vectorQueries"] = [{
-                "kind": "vector",
-                "vector": embeddings_query,
-                "fields": "contentVector",
-                "k": int(search_top_k)
-            }]
-
-        if use_semantic == "true" and search_approach != VECTOR_SEARCH_APPROACH:
+        body = _BODY_BUILDERS[_APPROACH](search_query, embeddings_query)
+
+        if _USE_SEMANTIC and _APPROACH != VECTOR_SEARCH_APPROACH:
             body["queryType"] = "semantic"
-            body["semanticConfiguration"] = semantic_search_config
+            body["semanticConfiguration"] = _SEMANTIC_SEARCH_CONFIG
 
         headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {azureSearchKey}'
         }
 
-        search_endpoint = f"https://{search_service}.search.windows.net/indexes/{search_index}/docs/search?api-version={search_api_version}"
-
         start_time = time.time()
-        response = requests.post(search_endpoint, headers=headers, json=body)
-        status_code = response.status_code
-        text = response.text
-        json =response.json()    
+        status_code, text, json = await _post_search(headers, orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY))
         if status_code >= 400:
             error_message = f'Status code: {status_code}.'
             if text != "":
@@ -82,19 +261,32 @@ def vector_index_retrieve(
             logging.error(f"[ai_search] error {status_code} when searching documents. {error_message}")
         else:
             if json['value']:
-                logging.info(f"[ai_search] {len(json['value'])} documents retrieved")
+                logging.info("[ai_search] %d documents retrieved", len(json['value']))
+                buf = io.StringIO()
                 for doc in json['value']:
-                    search_results.append(doc['filepath'] + ": " + doc['content'].strip() + "\n")
+                    buf.write(doc['filepath'])
+                    buf.write(": ")
+                    buf.write(doc['content'].strip())
+                    buf.write("\n")
+                sources = buf.getvalue()
+                if semantic_cache is not None:
+                    semantic_cache.set(embeddings_query, sources)
             else:
-                logging.info(f"[ai_search] No documents retrieved")
+                logging.info("[ai_search] No documents retrieved")
 
-        response_time = round(time.time() - start_time, 2)
-        logging.info(f"[ai_search] finished querying azure ai search. {response_time} seconds")
+        logging.info("[ai_search] finished querying azure ai search. %.2f seconds", time.time() - start_time)
 
     except Exception as e:
         error_message = str(e)
         logging.error(f"[ai_search] error when getting the answer {error_message}")
 
-    sources =  ' '.join(search_results)
     return sources
 
+
+
+async def vector_index_retrieve_many(
+    queries: Annotated[List[str], "Optimized query strings, one for each piece of information needed to answer the user's ask"]
+) -> Annotated[str, "The output is a string with the search results of each query"]:
+    """Runs vector_index_retrieve for all queries concurrently, so N searches take about as long as the slowest one."""
+    results = await asyncio.gather(*(vector_index_retrieve(query) for query in queries))
+    return "\n".join(f"Query: {query}\n{sources}" for query, sources in zip(queries, results))